@@ -6,7 +6,7 @@ import { useRouter } from "../../hooks/useRouter"
 import { useStores } from "../../hooks/useStores"
 import { aiBackend, GenerationStage } from "../../services/aiBackend"
 import type { ProgressEvent } from "../../services/aiBackend/types"
-import { runAgentLoop, type ToolCall } from "../../services/hybridAgent"
+import { runAgentStreamLoop, type ToolCall } from "../../services/hybridAgent"
 import type { ToolResult } from "../../services/hybridAgent/toolExecutor"
 import { VoiceRecorder, type DetectedNote } from "./VoiceRecorder"
 
@@ -496,6 +496,8 @@ export const AIChat: FC<AIChatProps> = ({ standalone = false }) => {
     setActiveThreadId,
   } = useAIChat()
   const [input, setInput] = useState("")
+  // Tool calls the hybrid agent has planned but the frontend has not run yet
+  const [plannedToolNames, setPlannedToolNames] = useState<string[]>([])
   const [backendStatus, setBackendStatus] = useState<
     "connected" | "disconnected" | "checking"
   >("checking")
@@ -601,14 +603,20 @@ export const AIChat: FC<AIChatProps> = ({ standalone = false }) => {
         console.log(`[AIChat] handleSubmit - activeThreadId: ${activeThreadId}`)
 
         try {
-          const result = await runAgentLoop(userMessage, songStore.song, {
+          const result = await runAgentStreamLoop(userMessage, songStore.song, {
             threadId: activeThreadId ?? undefined,
             abortSignal: abortController.signal,
             callbacks: {
+              onToolCallReady: (toolCall: ToolCall) => {
+                // Show each tool call as soon as it streams in, before the
+                // model has finished its turn
+                setPlannedToolNames((prev) => [...prev, toolCall.name])
+              },
               onToolsExecuted: (
                 toolCalls: ToolCall[],
                 results: ToolResult[],
               ) => {
+                setPlannedToolNames([])
                 // Navigate to arrange view when tools are actually executed (generation has started)
                 if (!hasNavigatedRef.current) {
                   setPath("/arrange")
@@ -706,6 +714,7 @@ export const AIChat: FC<AIChatProps> = ({ standalone = false }) => {
           })
         } finally {
           streamingMessageIndexRef.current = -1
+          setPlannedToolNames([])
           setIsLoading(false)
           abortControllerRef.current = null
         }
@@ -1098,6 +1107,13 @@ export const AIChat: FC<AIChatProps> = ({ standalone = false }) => {
             </ProgressBar>
           </ProgressContainer>
         )}
+        {isLoading && plannedToolNames.length > 0 && (
+          <ProgressContainer>
+            <ProgressMessage>
+              Planning: {plannedToolNames.join(", ")}
+            </ProgressMessage>
+          </ProgressContainer>
+        )}
         <div ref={messagesEndRef} />
       </MessageList>
       <InputContainer>
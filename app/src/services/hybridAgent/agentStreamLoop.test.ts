@@ -0,0 +1,104 @@
+import type { Song } from "@signal-app/core"
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest"
+import { runAgentStreamLoop } from "./agentStreamLoop"
+import { executeToolCalls } from "./toolExecutor"
+
+vi.mock("./toolExecutor", () => ({
+  executeToolCalls: vi.fn((_song: unknown, toolCalls: { id: string }[]) =>
+    toolCalls.map((tc) => ({ id: tc.id, result: "{}" })),
+  ),
+}))
+
+vi.mock("./songStateSerializer", () => ({
+  serializeSongState: vi.fn(() => ({})),
+  formatSongStateForPrompt: vi.fn(() => "Current song state:"),
+}))
+
+const song = {} as Song
+
+const toolCall = {
+  id: "call_1",
+  name: "setTempo",
+  args: { bpm: 90 },
+}
+
+function sseResponse(events: object[]): Response {
+  const body = events
+    .map((event) => `data: ${JSON.stringify(event)}\n\n`)
+    .join("")
+  return new Response(body, {
+    status: 200,
+    headers: { "Content-Type": "text/event-stream" },
+  })
+}
+
+describe("runAgentStreamLoop", () => {
+  const fetchMock = vi.fn()
+
+  beforeEach(() => {
+    vi.stubGlobal("fetch", fetchMock)
+  })
+
+  afterEach(() => {
+    vi.unstubAllGlobals()
+    fetchMock.mockReset()
+    vi.mocked(executeToolCalls).mockClear()
+  })
+
+  it("should not execute a ready tool call when the stream then errors", async () => {
+    fetchMock.mockResolvedValueOnce(
+      sseResponse([
+        { type: "tool_call_ready", thread_id: "t1", tool_call: toolCall },
+        { type: "error", thread_id: "t1", error: "Rate limited" },
+      ]),
+    )
+    const onToolCallReady = vi.fn()
+
+    const result = await runAgentStreamLoop("slow it down", song, {
+      callbacks: { onToolCallReady },
+    })
+
+    expect(onToolCallReady).toHaveBeenCalledWith(toolCall)
+    expect(executeToolCalls).not.toHaveBeenCalled()
+    expect(fetchMock).toHaveBeenCalledTimes(1)
+    expect(result).toMatchObject({
+      success: false,
+      stopReason: "error",
+      threadId: "t1",
+    })
+  })
+
+  it("should execute tool calls once the full batch arrives", async () => {
+    fetchMock
+      .mockResolvedValueOnce(
+        sseResponse([
+          { type: "tool_call_ready", thread_id: "t1", tool_call: toolCall },
+          {
+            type: "tool_calls",
+            thread_id: "t1",
+            tool_calls: [toolCall],
+            done: false,
+          },
+        ]),
+      )
+      .mockResolvedValueOnce(
+        sseResponse([
+          { type: "message", thread_id: "t1", content: "Done", done: true },
+        ]),
+      )
+
+    const result = await runAgentStreamLoop("slow it down", song)
+
+    expect(executeToolCalls).toHaveBeenCalledTimes(1)
+    expect(executeToolCalls).toHaveBeenCalledWith(song, [toolCall])
+    expect(JSON.parse(fetchMock.mock.calls[1][1].body)).toEqual({
+      thread_id: "t1",
+      tool_results: [{ id: "call_1", result: "{}" }],
+    })
+    expect(result).toMatchObject({
+      success: true,
+      stopReason: "complete",
+      message: "Done",
+    })
+  })
+})
@@ -24,6 +24,7 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000"
 /** SSE event types from the backend */
 type SSEEventType =
   | "thinking"
+  | "tool_call_ready"
   | "tool_calls"
   | "tool_results_received"
   | "message"
@@ -33,6 +34,7 @@ interface SSEEvent {
   type: SSEEventType
   thread_id: string
   content?: string
+  tool_call?: ToolCall
   tool_calls?: ToolCall[]
   count?: number
   done?: boolean
@@ -56,6 +58,11 @@ export interface AgentLoopResult {
 interface StreamingCallbacks {
   /** Called when agent is thinking/processing (streamed tokens) */
   onThinking?: (content: string) => void
+  /**
+   * Called as soon as a single tool call has streamed in completely, for
+   * display only. Tool calls are executed once the full batch arrives.
+   */
+  onToolCallReady?: (toolCall: ToolCall) => void
   /** Called when tool calls need to be executed */
   onToolCalls?: (toolCalls: ToolCall[]) => void
   /** Called after tool calls are executed with results */
@@ -274,6 +281,14 @@ export async function runAgentStreamLoop(
             }
             break
 
+          case "tool_call_ready":
+            // Display only: the song is not touched until the full tool_calls
+            // batch arrives, so an error or abort mid-stream leaves it as is
+            if (event.tool_call) {
+              callbacks?.onToolCallReady?.(event.tool_call)
+            }
+            break
+
           case "tool_calls":
             if (event.tool_calls && event.tool_calls.length > 0) {
               pendingToolCalls = event.tool_calls
@@ -1,5 +1,6 @@
 export { runAgentLoop } from "./agentLoop"
 export type { AgentLoopResult } from "./agentLoop"
+export { runAgentStreamLoop } from "./agentStreamLoop"
 export { executeToolCalls } from "./toolExecutor"
 export type { ToolCall, ToolResult } from "./toolExecutor"
 export {
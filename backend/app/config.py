@@ -5,6 +5,13 @@ from functools import lru_cache
 class Settings(BaseSettings):
     openrouter_api_key: str
     openrouter_model: str = "anthropic/claude-sonnet-4"
+    hybrid_agent_temperature: float = 0.7  # 0 enables the hybrid agent response caches
+    semantic_cache_enabled: bool = False
+    semantic_cache_model_dir: str = "models/all-MiniLM-L6-v2"
+    semantic_cache_threshold: float = 0.97
+    checkpoint_db_path: str = "data/checkpoints.db"
+    checkpoint_snapshot_seconds: int = 60
+    checkpoint_ttl_hours: int = 24
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
     debug: bool = False
 
@@ -1,9 +1,17 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.config import get_settings
 from app.routers import generate
+from app.services.hybrid_agent import (
+    open_checkpointer,
+    close_checkpointer,
+    init_agent,
+    close_agent,
+    close_http_client,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -21,10 +29,23 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open and close resources shared across requests."""
+    await open_checkpointer()
+    init_agent()
+    yield
+    close_agent()
+    await close_checkpointer()
+    await close_http_client()
+
+
 app = FastAPI(
     title="AI Music Composer API",
     description="Generate MIDI music from natural language prompts",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -597,6 +597,7 @@ async def agent_step_stream(request: AgentStepRequest, req: Request):
 
     Returns Server-Sent Events with the following event types:
     - thinking: Agent reasoning/processing (streamed tokens)
+    - tool_call_ready: One tool call, sent as soon as its arguments are complete
     - tool_calls: Tools to execute on frontend (pauses stream, wait for resume)
     - tool_results_received: Acknowledgment after frontend sends tool results
     - message: Final response from agent
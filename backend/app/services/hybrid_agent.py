@@ -4,17 +4,47 @@ Uses DeepAgents with interrupt_before to pause before tool execution,
 returning tool calls to the frontend for execution against the MobX store.
 """
 
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import suppress
 from typing import Any, Optional
+import aiosqlite
+import httpx
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.tools import tool
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import create_react_agent
 from langgraph.types import Command
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+# Shared HTTP client so every model call reuses pooled HTTP/2 connections to
+# OpenRouter instead of paying TCP/TLS setup. Closed by close_http_client().
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=300),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client on shutdown."""
+    await http_client.aclose()
+
+
 # Initialize LLM
 model = ChatOpenAI(
     model=settings.openrouter_model,
@@ -24,16 +54,142 @@ model = ChatOpenAI(
         "HTTP-Referer": "https://github.com/signal-music-composer",
         "X-Title": "AI Music Composer",
     },
-    temperature=0.7,
+    temperature=settings.hybrid_agent_temperature,
     max_tokens=4096,
+    http_async_client=http_client,
 )
 
-# In-memory checkpointer for session persistence
-# In production, use SqliteSaver or PostgresSaver
-checkpointer = MemorySaver()
+# Checkpointer for session persistence. Checkpoints live in an in-memory
+# SQLite database for dict-speed reads and are snapshotted to disk with the
+# SQLite backup API, so sessions survive restarts without an fsync per step.
+# Opened by open_checkpointer() on app startup.
+checkpointer: Optional[AsyncSqliteSaver] = None
+_checkpoint_conn: Optional[aiosqlite.Connection] = None
+_snapshot_task: Optional[asyncio.Task] = None
+# False when the disk file is unusable; sessions then live in memory only
+_snapshots_enabled = False
+
+# Last activity per thread, used to drop abandoned sessions
+thread_last_seen: dict[str, float] = {}
+
+
+def touch_thread(thread_id: str) -> None:
+    """Record activity on a thread so it is kept by the checkpoint pruner."""
+    thread_last_seen[thread_id] = time.monotonic()
+
+
+async def snapshot_checkpoints() -> None:
+    """Copy the in-memory checkpoint database to the WAL-backed disk file."""
+    async with aiosqlite.connect(settings.checkpoint_db_path) as disk:
+        # executescript runs to completion; a pending cursor would block backup
+        await disk.executescript("PRAGMA journal_mode=WAL;")
+        await _checkpoint_conn.backup(disk)
+
+
+async def prune_checkpoints() -> None:
+    """Delete threads with no activity within the checkpoint TTL."""
+    cutoff = time.monotonic() - settings.checkpoint_ttl_hours * 3600
+    stale = [tid for tid, seen in thread_last_seen.items() if seen < cutoff]
+    for thread_id in stale:
+        await checkpointer.adelete_thread(thread_id)
+        del thread_last_seen[thread_id]
+    if stale:
+        logger.info("Pruned %d stale agent threads", len(stale))
+
+
+async def _snapshot_loop() -> None:
+    """Prune and snapshot checkpoints on a fixed interval until cancelled."""
+    while True:
+        await asyncio.sleep(settings.checkpoint_snapshot_seconds)
+        try:
+            await prune_checkpoints()
+        except Exception:
+            logger.exception("Checkpoint pruning failed")
+        if _snapshots_enabled:
+            try:
+                await snapshot_checkpoints()
+            except Exception:
+                logger.exception("Checkpoint snapshot failed")
+
+
+async def open_checkpointer() -> None:
+    """Open the in-memory checkpointer, restore it from disk, start snapshots.
+
+    If the disk file cannot be created or read, the checkpointer still opens
+    and sessions are kept in memory only, so the rest of the API is unaffected.
+    """
+    global checkpointer, _checkpoint_conn, _snapshot_task, _snapshots_enabled
 
-# System prompt for the hybrid agent
-HYBRID_SYSTEM_PROMPT = """You are a music composition assistant that creates MIDI compositions by calling tools.
+    conn = await aiosqlite.connect(":memory:")
+    await conn.executescript(
+        "PRAGMA journal_mode=MEMORY; PRAGMA synchronous=OFF; PRAGMA temp_store=MEMORY;"
+    )
+
+    _snapshots_enabled = True
+    try:
+        db_dir = os.path.dirname(settings.checkpoint_db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        if os.path.exists(settings.checkpoint_db_path):
+            async with aiosqlite.connect(settings.checkpoint_db_path) as disk:
+                await disk.backup(conn)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(
+            "Cannot use checkpoint file %s (%s); agent sessions will not survive restarts",
+            settings.checkpoint_db_path, e,
+        )
+        _snapshots_enabled = False
+
+    checkpointer = AsyncSqliteSaver(conn)
+    await checkpointer.setup()
+    _checkpoint_conn = conn
+
+    # Write once now so an unwritable file is reported at startup, not every minute
+    if _snapshots_enabled:
+        try:
+            await snapshot_checkpoints()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(
+                "Cannot write checkpoint file %s (%s); agent sessions will not survive restarts",
+                settings.checkpoint_db_path, e,
+            )
+            _snapshots_enabled = False
+
+    # Restored threads get a full TTL from startup
+    async with conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+        async for (thread_id,) in cursor:
+            touch_thread(thread_id)
+    logger.info("Checkpointer ready with %d restored threads", len(thread_last_seen))
+
+    _snapshot_task = asyncio.create_task(_snapshot_loop())
+
+
+async def close_checkpointer() -> None:
+    """Stop snapshots, write a final snapshot and close the checkpointer."""
+    global checkpointer, _checkpoint_conn, _snapshot_task
+
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _snapshot_task
+        _snapshot_task = None
+    if _checkpoint_conn is not None:
+        if _snapshots_enabled:
+            try:
+                await snapshot_checkpoints()
+            except Exception:
+                logger.exception("Final checkpoint snapshot failed")
+        await _checkpoint_conn.close()
+    checkpointer = None
+    _checkpoint_conn = None
+
+# System prompt for the hybrid agent, split in two so the cacheable prefix
+# is as long as possible:
+# - PERSISTENT_SYSTEM_PROMPT: tool grammar, song state format and MIDI
+#   reference. Never changes; edits here invalidate every cached prefix.
+# - VOLATILE_SYSTEM_PROMPT: workflow and conversation guidance that may be
+#   tuned. Always sent after the persistent block.
+PERSISTENT_SYSTEM_PROMPT = """You are a music composition assistant that creates MIDI compositions by calling tools.
 
 You have access to tools that manipulate a MIDI sequencer:
 - createTrack: Create a new track with an instrument
@@ -71,9 +227,9 @@ MIDI REFERENCE:
 - Timing: 480 ticks = 1 quarter note
 - Durations: whole=1920, half=960, quarter=480, eighth=240, sixteenth=120
 - Velocity: 1-127 (loudness), typical range 60-100
-- Common scales from C: Major [60,62,64,65,67,69,71,72], Minor [60,62,63,65,67,68,70,72]
+- Common scales from C: Major [60,62,64,65,67,69,71,72], Minor [60,62,63,65,67,68,70,72]"""
 
-WORKFLOW:
+VOLATILE_SYSTEM_PROMPT = """WORKFLOW:
 1. Check the song state to see what exists
 2. For simple, clear requests (e.g., "add a piano track", "write a C scale"), execute tools directly
 3. For complex or ambiguous requests, discuss with the user first via your response message:
@@ -83,6 +239,7 @@ WORKFLOW:
 4. When the user approves or gives you direction, execute tools to create the music
 5. Only set tempo/time signature if needed (check current values first)
 6. Reuse existing tracks when appropriate instead of creating new ones
+7. When operations are independent (different trackIds, or createTrack for several tracks with no cross-dependency), emit all tool calls in a SINGLE assistant turn so the frontend can execute them together
 
 IMPORTANT - CONVERSATION MEMORY:
 - This is a multi-turn conversation. ALWAYS remember what the user told you earlier.
@@ -93,6 +250,30 @@ IMPORTANT - CONVERSATION MEMORY:
 Be concise in your responses. Focus on helping the user create great music."""
 
 
+def build_system_message(persistent: str, volatile: str) -> SystemMessage:
+    """Wrap the system prompt in a message the provider can cache.
+
+    Anthropic models (routed through OpenRouter) only cache prefixes that end
+    in an explicit cache_control breakpoint, which must sit on a content block.
+    Both blocks get one, so the whole system prompt is cached, and an edit to
+    the volatile block still hits the cache up to the persistent breakpoint.
+    OpenAI-family models cache identical prefixes automatically, so the plain
+    string is sent unchanged for them.
+    """
+    if settings.openrouter_model.startswith("anthropic/"):
+        return SystemMessage(
+            content=[
+                {"type": "text", "text": persistent, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": volatile, "cache_control": {"type": "ephemeral"}},
+            ]
+        )
+    return SystemMessage(content=f"{persistent}\n\n{volatile}")
+
+
+# Built once and never mutated so the cached prefix stays byte-identical
+SYSTEM_MESSAGE = build_system_message(PERSISTENT_SYSTEM_PROMPT, VOLATILE_SYSTEM_PROMPT)
+
+
 # Tool definitions that match the frontend schemas
 # These are "dummy" tools - they just return a placeholder since actual execution happens on frontend
 
@@ -120,7 +301,7 @@ def addNotes(trackId: int, notes: list[dict]) -> str:
         notes: Array of notes, each with: pitch (0-127, middle C=60), start (ticks, 480=quarter), duration (ticks), velocity (1-127, optional, default 100)
 
     Returns:
-        JSON with trackId and noteCount
+        JSON with trackId and noteCount. The notes are not echoed back.
     """
     return '{"status": "pending_frontend_execution"}'
 
@@ -155,36 +336,326 @@ def setTimeSignature(numerator: int, denominator: int, tick: int = 0) -> str:
 
 
 # All available tools
-TOOLS = [createTrack, addNotes, setTempo, setTimeSignature]
+TOOLS = (createTrack, addNotes, setTempo, setTimeSignature)
 
+# Tool schemas are serialized once here rather than when the graph binds them.
+# Independent tool calls come back in one turn and one frontend round-trip.
+MODEL_WITH_TOOLS = model.bind_tools(TOOLS, parallel_tool_calls=True)
 
-def create_agent():
-    """Create the hybrid agent with interrupt_before for tool execution."""
+
+def create_agent() -> CompiledStateGraph:
+    """Create the hybrid agent with interrupt_before for tool execution.
+
+    Everything static (tools, bound model, system message, checkpointer,
+    interrupt node) is baked into one compiled graph, built once at startup
+    and reused for every request.
+    """
+    if checkpointer is None:
+        raise RuntimeError("Checkpointer is not open; call open_checkpointer() on startup")
     agent = create_react_agent(
-        model=model,
+        model=MODEL_WITH_TOOLS,
         tools=TOOLS,
         checkpointer=checkpointer,
         interrupt_before=["tools"],  # Pause before executing tools
-        prompt=HYBRID_SYSTEM_PROMPT,
+        prompt=SYSTEM_MESSAGE,  # Always message index 0
     )
+    assert isinstance(agent, CompiledStateGraph)
     return agent
 
 
-# Singleton agent instance
+class ResponseCache:
+    """Small in-process LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: bytes, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+# Tool-call plans for fresh sessions, keyed on (context, prompt). Only used
+# when sampling is deterministic, otherwise a replay would hide the variety
+# the user expects from asking again. Final assistant text is never cached.
+response_cache = ResponseCache(maxsize=512, ttl=300)
+
+# Near-duplicate prompts ("make drums louder" / "turn up the drums") against
+# the same song state replay an earlier plan, also only at temperature 0.
+# Opt-in: needs a local embedding model and optional dependencies.
+semantic_cache = None
+if settings.semantic_cache_enabled:
+    from app.services.semantic_cache import SemanticCache
+
+    semantic_cache = SemanticCache(
+        settings.semantic_cache_model_dir,
+        threshold=settings.semantic_cache_threshold,
+    )
+
+
+def response_cache_key(prompt: str, context: Optional[str]) -> bytes:
+    """Hash the song state and prompt into a response cache key."""
+    return hashlib.blake2b(f"{context or ''}\0{prompt}".encode(), digest_size=16).digest()
+
+
+def response_cache_enabled() -> bool:
+    """Only cache when the model is configured for deterministic output."""
+    return settings.hybrid_agent_temperature == 0
+
+
+async def replay_tool_calls(agent, config: dict, new_messages: list, tool_calls: list[dict]) -> None:
+    """Seed a fresh thread with a cached tool-call plan without calling the LLM.
+
+    Writes the user turn and an AI message carrying the cached tool calls as
+    if the agent node had produced them, leaving the thread paused before the
+    tools node so resume_agent_step works exactly as after a live call.
+    """
+    await agent.aupdate_state(
+        config,
+        {"messages": new_messages + [AIMessage(content="", tool_calls=tool_calls)]},
+        as_node="agent",
+    )
+
+
+class PendingToolCall:
+    """A tool call whose JSON arguments are still being streamed."""
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.args: list[str] = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.complete = False
+
+    def feed(self, fragment: str) -> bool:
+        """Append an arguments fragment; return True once the JSON object closes."""
+        self.args.append(fragment)
+        for ch in fragment:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+                self.started = True
+            elif ch in "}]":
+                self.depth -= 1
+        return self.started and self.depth == 0
+
+
+class ToolCallAssembler:
+    """Reassembles streamed tool call chunks into complete tool calls.
+
+    Tool call arguments arrive as JSON fragments in chunk.tool_call_chunks.
+    Fragments are buffered per (run_id, index), and each call is returned as
+    soon as its arguments form a complete object, before the model has
+    finished the rest of its turn.
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple[str, int], PendingToolCall] = {}
+
+    def add(self, run_id: str, chunks: list[dict]) -> list[dict]:
+        ready = []
+        for tc_chunk in chunks:
+            key = (run_id, tc_chunk.get("index") or 0)
+            pending = self._pending.setdefault(key, PendingToolCall())
+            if pending.complete:
+                continue
+            if tc_chunk.get("id"):
+                pending.id = tc_chunk["id"]
+            if tc_chunk.get("name"):
+                pending.name = tc_chunk["name"]
+            if not tc_chunk.get("args") or not pending.feed(tc_chunk["args"]):
+                continue
+            pending.complete = True
+            try:
+                args = json.loads("".join(pending.args))
+            except json.JSONDecodeError:
+                continue  # Left for the post-stream state check
+            if pending.id and pending.name:
+                ready.append({"id": pending.id, "name": pending.name, "args": args})
+        return ready
+
+    def finish(self, run_id: str) -> None:
+        """Discard buffers for a run whose model stream has ended."""
+        for key in [key for key in self._pending if key[0] == run_id]:
+            del self._pending[key]
+
+
+# Singleton agent instance, built once at startup by init_agent().
+# Not created lazily: concurrent first requests must never see two agents
+# wired to different checkpointers.
 _agent = None
 
 
-def get_agent():
-    """Get or create the singleton agent instance."""
-    global _agent
+def get_agent() -> CompiledStateGraph:
+    """Get the singleton agent instance."""
     if _agent is None:
-        _agent = create_agent()
+        raise RuntimeError("Agent is not initialized; call init_agent() on startup")
     return _agent
 
 
+def init_agent() -> None:
+    """Build the singleton agent. Call on startup, after open_checkpointer()."""
+    global _agent
+    _agent = create_agent()
+
+
+def close_agent() -> None:
+    """Drop the singleton agent. Call on shutdown, before close_checkpointer()."""
+    global _agent
+    _agent = None
+
+
+# Provider errors worth explaining to the user, matched in a single pass
+API_ERROR_RE = re.compile(r"\b(401|402|429)\b|payment required|unauthorized|rate limit", re.IGNORECASE)
+
+API_ERROR_KEYWORD_CODES = {
+    "unauthorized": 401,
+    "payment required": 402,
+    "rate limit": 429,
+}
+
+API_ERROR_MESSAGES = {
+    401: "The model provider rejected the API key. Check OPENROUTER_API_KEY.",
+    402: "The model provider account is out of credits.",
+    429: "The model provider is rate limiting requests. Please wait a moment and try again.",
+}
+
+
+def format_api_error(error: Exception) -> str:
+    """Turn a model provider error into a message suitable for the user."""
+    error_msg = str(error)
+    match = API_ERROR_RE.search(error_msg)
+    if match is None:
+        return error_msg
+    # The mapped message hides the provider's text, so keep it in the server log
+    logger.warning("Model provider error: %s", error_msg)
+    code = int(match.group(1)) if match.group(1) else API_ERROR_KEYWORD_CODES[match.group(0).lower()]
+    return API_ERROR_MESSAGES[code]
+
+
+def message_content(message: Any) -> str:
+    """Return a message's text, falling back to its string form."""
+    content = getattr(message, "content", None)
+    return str(message) if content is None else content
+
+
+def extract_tool_calls(message: Any) -> list[dict]:
+    """Return a message's tool calls in the shape the frontend expects."""
+    return [
+        {"id": tc["id"], "name": tc["name"], "args": tc["args"]}
+        for tc in getattr(message, "tool_calls", None) or []
+    ]
+
+
+def step_result(thread_id: str, messages: list) -> dict:
+    """Build the step result from the messages at the end of a run.
+
+    With interrupt_before=["tools"], the graph pauses exactly when the last
+    AI message has tool calls, so those tool calls alone tell us whether we
+    are paused; no separate state.next check is needed. Otherwise the agent
+    is done and that message is its reply.
+
+    Returns:
+        dict with thread_id, tool_calls, done and message, as documented on
+        start_agent_step.
+    """
+    last_message = messages[-1] if messages else None
+    tool_calls = extract_tool_calls(last_message)
+    if tool_calls:
+        return {
+            "thread_id": thread_id,
+            "tool_calls": tool_calls,
+            "done": False,
+            "message": None,
+        }
+    return {
+        "thread_id": thread_id,
+        "tool_calls": [],
+        "done": True,
+        "message": message_content(last_message) if last_message is not None else None,
+    }
+
+
+async def finalize_step(agent, config: dict, thread_id: str) -> dict:
+    """Build the step result from the checkpoint, for runs that were streamed."""
+    state = await agent.aget_state(config)
+    messages = state.values.get("messages", []) if state.values else []
+    return step_result(thread_id, messages)
+
+
+# Tool results are short acknowledgements ({"trackId": 1, "noteCount": 16});
+# anything larger is song data the model already has and would only add
+# prefill tokens to the resumed turn.
+MAX_TOOL_RESULT_BYTES = 256
+
+
+def cap_tool_result(tool_result: dict) -> str:
+    """Return a tool result's content, or a short JSON error if it is too large.
+
+    Oversized results are replaced rather than cut, so the model always gets
+    valid JSON back.
+    """
+    content = tool_result["result"]
+    size = len(content.encode())
+    if size <= MAX_TOOL_RESULT_BYTES:
+        return content
+    logger.warning(
+        "Tool result for %s is %d bytes, over the %d byte limit; replacing it",
+        tool_result["id"], size, MAX_TOOL_RESULT_BYTES,
+    )
+    return json.dumps({"error": "result too large", "bytes": size})
+
+
+def build_tool_messages(tool_results: list[dict]) -> list[ToolMessage]:
+    """Build the ToolMessages to resume with, replacing oversized results."""
+    return [
+        ToolMessage(content=cap_tool_result(tr), tool_call_id=tr["id"])
+        for tr in tool_results
+    ]
+
+
 def generate_thread_id() -> str:
     """Generate a new thread ID for a session."""
-    return str(uuid.uuid4())
+    return uuid.uuid4().hex
+
+
+def build_turn_messages(prompt: str, context: Optional[str] = None) -> list[HumanMessage]:
+    """Build the user-turn messages for a new request.
+
+    The song state and the user's request are sent as separate messages at the
+    tail of the conversation, so everything before them (system prompt and
+    earlier turns) stays a stable, cacheable prefix.
+    """
+    messages = []
+    if context:
+        messages.append(HumanMessage(content=context))
+    messages.append(HumanMessage(content=f"User request: {prompt}"))
+    return messages
 
 
 async def start_agent_step(prompt: str, thread_id: Optional[str] = None, context: Optional[str] = None) -> dict:
@@ -205,10 +676,45 @@ async def start_agent_step(prompt: str, thread_id: Optional[str] = None, context
     agent = get_agent()
 
     # Create or reuse thread ID
+    is_new_thread = thread_id is None
     if thread_id is None:
         thread_id = generate_thread_id()
 
     config = {"configurable": {"thread_id": thread_id}}
+    touch_thread(thread_id)
+
+    # Song state and request go at the tail, after the cached prefix
+    new_messages = build_turn_messages(prompt, context)
+
+    # Fresh sessions with an identical (context, prompt) replay the cached plan
+    cache_key = None
+    if is_new_thread and response_cache_enabled():
+        cache_key = response_cache_key(prompt, context)
+        cached_tool_calls = response_cache.get(cache_key)
+        if cached_tool_calls is not None:
+            logger.info("Response cache hit, replaying %d tool calls", len(cached_tool_calls))
+            await replay_tool_calls(agent, config, new_messages, cached_tool_calls)
+            return {
+                "thread_id": thread_id,
+                "tool_calls": cached_tool_calls,
+                "done": False,
+                "message": None,
+            }
+
+    # Then fall back to prompts that mean the same thing, under the same rule
+    prompt_embedding = None
+    if is_new_thread and response_cache_enabled() and semantic_cache is not None:
+        prompt_embedding = await asyncio.to_thread(semantic_cache.embed, prompt)
+        cached_tool_calls = semantic_cache.lookup(prompt_embedding, context)
+        if cached_tool_calls is not None:
+            logger.info("Semantic cache hit, replaying %d tool calls", len(cached_tool_calls))
+            await replay_tool_calls(agent, config, new_messages, cached_tool_calls)
+            return {
+                "thread_id": thread_id,
+                "tool_calls": cached_tool_calls,
+                "done": False,
+                "message": None,
+            }
 
     # Load existing conversation history from checkpoint
     existing_state = await agent.aget_state(config)
@@ -221,18 +727,12 @@ async def start_agent_step(prompt: str, thread_id: Optional[str] = None, context
     print(f"[HYBRID_AGENT] existing_state.values keys: {existing_state.values.keys() if existing_state.values else 'None'}")
     print(f"{'='*60}\n")
 
-    # Build the full message with context if provided
-    full_prompt = prompt
-    if context:
-        full_prompt = f"{context}\n\n---\n\nUser request: {prompt}"
-
     # Build the message list - include history if continuing conversation
-    new_message = {"role": "user", "content": full_prompt}
     if existing_messages:
-        messages_to_send = {"messages": existing_messages + [new_message]}
-        print(f"[HYBRID_AGENT] CONTINUING conversation with {len(existing_messages)} + 1 messages")
+        messages_to_send = {"messages": existing_messages + new_messages}
+        print(f"[HYBRID_AGENT] CONTINUING conversation with {len(existing_messages)} + {len(new_messages)} messages")
     else:
-        messages_to_send = {"messages": [new_message]}
+        messages_to_send = {"messages": new_messages}
         print(f"[HYBRID_AGENT] STARTING new conversation")
 
     # Invoke the agent
@@ -242,38 +742,63 @@ async def start_agent_step(prompt: str, thread_id: Optional[str] = None, context
     )
 
     # Check if we're paused at interrupt (tool calls pending)
-    state = await agent.aget_state(config)
+    step = step_result(thread_id, result["messages"])
+    if cache_key is not None and step["tool_calls"]:
+        response_cache.set(cache_key, step["tool_calls"])
+    if prompt_embedding is not None and step["tool_calls"]:
+        semantic_cache.store(prompt_embedding, context, step["tool_calls"])
+    return step
 
-    if state.next:  # There are pending nodes (we hit interrupt)
-        # Extract tool calls from the last AI message
-        last_message = result["messages"][-1]
-        tool_calls = []
 
-        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-            for tc in last_message.tool_calls:
-                tool_calls.append({
-                    "id": tc["id"],
-                    "name": tc["name"],
-                    "args": tc["args"],
-                })
+async def start_agent_step_batch(
+    prompts: list[tuple[str, Optional[str]]],
+    batch_size: int = 5,
+    delay: float = 0.0,
+) -> list[dict]:
+    """Start a fresh session for each prompt, running them concurrently.
 
-        return {
-            "thread_id": thread_id,
-            "tool_calls": tool_calls,
-            "done": False,
-            "message": None,
-        }
-    else:
-        # Agent completed
-        last_message = result["messages"][-1]
-        content = last_message.content if hasattr(last_message, "content") else str(last_message)
+    Intended for evaluation workloads over many prompts. Each batch is sent
+    with a single agent.abatch call so requests share the HTTP connection pool.
 
-        return {
-            "thread_id": thread_id,
-            "tool_calls": [],
-            "done": True,
-            "message": content,
-        }
+    Args:
+        prompts: List of (prompt, context) pairs. Context may be None.
+        batch_size: Number of prompts sent concurrently per batch.
+        delay: Seconds to wait between batches, to stay under rate limits.
+
+    Returns:
+        List of results in the same format as start_agent_step, in input order.
+        A prompt that failed gives {"thread_id", "error"} instead, so one
+        failure (e.g. a rate limit) does not discard the other results.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+    agent = get_agent()
+    results = []
+
+    for start in range(0, len(prompts), batch_size):
+        if start and delay:
+            await asyncio.sleep(delay)
+
+        batch = prompts[start:start + batch_size]
+        thread_ids = [generate_thread_id() for _ in batch]
+        configs = [{"configurable": {"thread_id": thread_id}} for thread_id in thread_ids]
+        for thread_id in thread_ids:
+            touch_thread(thread_id)
+
+        outputs = await agent.abatch(
+            [{"messages": build_turn_messages(prompt, context)} for prompt, context in batch],
+            config=configs,
+            return_exceptions=True,
+        )
+        results.extend(
+            {"thread_id": thread_id, "error": format_api_error(output)}
+            if isinstance(output, Exception)
+            else step_result(thread_id, output["messages"])
+            for thread_id, output in zip(thread_ids, outputs)
+        )
+
+    return results
 
 
 async def resume_agent_step(thread_id: str, tool_results: list[dict]) -> dict:
@@ -284,24 +809,18 @@ async def resume_agent_step(thread_id: str, tool_results: list[dict]) -> dict:
         tool_results: List of tool results, each with:
             - id: Tool call ID from the original tool_calls
             - result: JSON string result from frontend execution
+            Results for one interrupt may arrive in any order; they are
+            matched to their calls by id.
 
     Returns:
         Same format as start_agent_step
     """
     agent = get_agent()
     config = {"configurable": {"thread_id": thread_id}}
+    touch_thread(thread_id)
 
     # Build tool messages to resume with
-    from langchain_core.messages import ToolMessage
-
-    tool_messages = []
-    for tr in tool_results:
-        tool_messages.append(
-            ToolMessage(
-                content=tr["result"],
-                tool_call_id=tr["id"],
-            )
-        )
+    tool_messages = build_tool_messages(tool_results)
 
     # Resume the agent with tool results
     result = await agent.ainvoke(
@@ -309,37 +828,8 @@ async def resume_agent_step(thread_id: str, tool_results: list[dict]) -> dict:
         config=config,
     )
 
-    # Check state again
-    state = await agent.aget_state(config)
-
-    if state.next:  # More tool calls
-        last_message = result["messages"][-1]
-        tool_calls = []
-
-        if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-            for tc in last_message.tool_calls:
-                tool_calls.append({
-                    "id": tc["id"],
-                    "name": tc["name"],
-                    "args": tc["args"],
-                })
-
-        return {
-            "thread_id": thread_id,
-            "tool_calls": tool_calls,
-            "done": False,
-            "message": None,
-        }
-    else:
-        last_message = result["messages"][-1]
-        content = last_message.content if hasattr(last_message, "content") else str(last_message)
-
-        return {
-            "thread_id": thread_id,
-            "tool_calls": [],
-            "done": True,
-            "message": content,
-        }
+    # Check for more tool calls
+    return step_result(thread_id, result["messages"])
 
 
 async def stream_agent_step(prompt: str, thread_id: Optional[str] = None, context: Optional[str] = None):
@@ -347,6 +837,7 @@ async def stream_agent_step(prompt: str, thread_id: Optional[str] = None, contex
 
     Yields events:
         - thinking: Agent reasoning/processing
+        - tool_call_ready: A single tool call, as soon as its arguments are complete
         - tool_calls: Tools to execute on frontend
         - message: Final response from agent
         - error: Any errors that occurred
@@ -367,35 +858,29 @@ async def stream_agent_step(prompt: str, thread_id: Optional[str] = None, contex
         thread_id = generate_thread_id()
 
     config = {"configurable": {"thread_id": thread_id}}
+    touch_thread(thread_id)
 
     # Load existing conversation history from checkpoint
     existing_state = await agent.aget_state(config)
     existing_messages = existing_state.values.get("messages", []) if existing_state.values else []
     print(f"[DEBUG] Thread {thread_id[:8]}... is_new={is_new_thread}, existing_messages={len(existing_messages)}")
 
-    # Build the full message with context if provided
-    full_prompt = prompt
-    if context:
-        full_prompt = f"{context}\n\n---\n\nUser request: {prompt}"
+    # Song state and request go at the tail, after the cached prefix
+    new_messages = build_turn_messages(prompt, context)
 
     # Build the message list - include history if continuing conversation
-    new_message = {"role": "user", "content": full_prompt}
     if existing_messages:
-        # Continue existing conversation - append new message to history
+        # Continue existing conversation - append new messages to history
         # The existing_messages are LangChain message objects, we need to pass them through
-        messages_to_send = {"messages": existing_messages + [new_message]}
-        print(f"[DEBUG] Continuing conversation with {len(existing_messages)} existing + 1 new message")
+        messages_to_send = {"messages": existing_messages + new_messages}
+        print(f"[DEBUG] Continuing conversation with {len(existing_messages)} existing + {len(new_messages)} new messages")
     else:
         # New conversation
-        messages_to_send = {"messages": [new_message]}
+        messages_to_send = {"messages": new_messages}
         print(f"[DEBUG] Starting new conversation")
 
     try:
-        # Emit thinking event
-        yield {"type": "thinking", "thread_id": thread_id, "content": "Processing your request..."}
-
-        # Track which LLM run we've seen to avoid duplicate tokens
-        seen_tokens = set()
+        tool_call_assembler = ToolCallAssembler()
 
         # Stream events from the agent
         async for event in agent.astream_events(
@@ -409,57 +894,41 @@ async def stream_agent_step(prompt: str, thread_id: Optional[str] = None, contex
             # Handle LLM streaming tokens - only from chat model events
             if event_type == "on_chat_model_stream":
                 chunk = event.get("data", {}).get("chunk")
+                # astream_events delivers each run's chunks once and in order,
+                # so every chunk is forwarded without deduplication
                 if chunk and hasattr(chunk, "content") and chunk.content:
-                    # Create a unique key for this token to avoid duplicates
-                    token_key = f"{run_id}:{chunk.content}"
-                    if token_key not in seen_tokens:
-                        seen_tokens.add(token_key)
-                        yield {"type": "thinking", "thread_id": thread_id, "content": chunk.content}
+                    yield {"type": "thinking", "thread_id": thread_id, "content": chunk.content}
+
+                # Forward each tool call as soon as its arguments are complete
+                if chunk and getattr(chunk, "tool_call_chunks", None):
+                    for tool_call in tool_call_assembler.add(run_id, chunk.tool_call_chunks):
+                        yield {"type": "tool_call_ready", "thread_id": thread_id, "tool_call": tool_call}
+
+            # Drop buffers for finished runs so memory is bounded by live runs
+            elif event_type == "on_chat_model_end":
+                tool_call_assembler.finish(run_id)
 
         # After streaming completes, check state for tool calls or completion
-        state = await agent.aget_state(config)
-        final_messages = state.values.get("messages", []) if state.values else []
-        print(f"[DEBUG stream_agent_step] After stream: thread {thread_id[:8]}... has {len(final_messages)} messages")
-        for i, msg in enumerate(final_messages):
-            role = getattr(msg, 'type', 'unknown')
-            content_preview = str(getattr(msg, 'content', ''))[:80]
-            print(f"[DEBUG stream_agent_step]   [{i}] {role}: {content_preview}...")
-
-        if state.next:
-            # Agent is paused at interrupt - extract tool calls
-            messages = state.values.get("messages", [])
-            if messages:
-                last_msg = messages[-1]
-                if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-                    tool_calls = []
-                    for tc in last_msg.tool_calls:
-                        tool_calls.append({
-                            "id": tc["id"],
-                            "name": tc["name"],
-                            "args": tc["args"],
-                        })
-                    yield {
-                        "type": "tool_calls",
-                        "thread_id": thread_id,
-                        "tool_calls": tool_calls,
-                        "done": False,
-                    }
-                    return
-
-        # Agent completed - get final message
-        messages = state.values.get("messages", [])
-        if messages:
-            last_message = messages[-1]
-            content = last_message.content if hasattr(last_message, "content") else str(last_message)
+        step = await finalize_step(agent, config, thread_id)
+        if not step["done"]:
+            # Agent is paused at interrupt - send tool calls
+            yield {
+                "type": "tool_calls",
+                "thread_id": thread_id,
+                "tool_calls": step["tool_calls"],
+                "done": False,
+            }
+        elif step["message"] is not None:
+            # Agent completed - send final message
             yield {
                 "type": "message",
                 "thread_id": thread_id,
-                "content": content,
+                "content": step["message"],
                 "done": True,
             }
 
     except Exception as e:
-        yield {"type": "error", "thread_id": thread_id, "error": str(e)}
+        yield {"type": "error", "thread_id": thread_id, "error": format_api_error(e)}
 
 
 async def stream_agent_resume(thread_id: str, tool_results: list[dict]):
@@ -468,6 +937,7 @@ async def stream_agent_resume(thread_id: str, tool_results: list[dict]):
     Yields events:
         - tool_results_received: Acknowledgment of tool results
         - thinking: Agent reasoning/processing
+        - tool_call_ready: A single tool call, as soon as its arguments are complete
         - tool_calls: More tools to execute
         - message: Final response from agent
         - error: Any errors that occurred
@@ -479,10 +949,9 @@ async def stream_agent_resume(thread_id: str, tool_results: list[dict]):
     Yields:
         dict with 'type' and event-specific data
     """
-    from langchain_core.messages import ToolMessage
-
     agent = get_agent()
     config = {"configurable": {"thread_id": thread_id}}
+    touch_thread(thread_id)
 
     # Acknowledge tool results received
     yield {
@@ -492,20 +961,10 @@ async def stream_agent_resume(thread_id: str, tool_results: list[dict]):
     }
 
     # Build tool messages
-    tool_messages = []
-    for tr in tool_results:
-        tool_messages.append(
-            ToolMessage(
-                content=tr["result"],
-                tool_call_id=tr["id"],
-            )
-        )
+    tool_messages = build_tool_messages(tool_results)
 
     try:
-        yield {"type": "thinking", "thread_id": thread_id, "content": "Processing tool results..."}
-
-        # Track which LLM run we've seen to avoid duplicate tokens
-        seen_tokens = set()
+        tool_call_assembler = ToolCallAssembler()
 
         # Stream events from the agent
         async for event in agent.astream_events(
@@ -519,48 +978,38 @@ async def stream_agent_resume(thread_id: str, tool_results: list[dict]):
             # Handle LLM streaming tokens - only from chat model events
             if event_type == "on_chat_model_stream":
                 chunk = event.get("data", {}).get("chunk")
+                # astream_events delivers each run's chunks once and in order,
+                # so every chunk is forwarded without deduplication
                 if chunk and hasattr(chunk, "content") and chunk.content:
-                    # Create a unique key for this token to avoid duplicates
-                    token_key = f"{run_id}:{chunk.content}"
-                    if token_key not in seen_tokens:
-                        seen_tokens.add(token_key)
-                        yield {"type": "thinking", "thread_id": thread_id, "content": chunk.content}
+                    yield {"type": "thinking", "thread_id": thread_id, "content": chunk.content}
+
+                # Forward each tool call as soon as its arguments are complete
+                if chunk and getattr(chunk, "tool_call_chunks", None):
+                    for tool_call in tool_call_assembler.add(run_id, chunk.tool_call_chunks):
+                        yield {"type": "tool_call_ready", "thread_id": thread_id, "tool_call": tool_call}
+
+            # Drop buffers for finished runs so memory is bounded by live runs
+            elif event_type == "on_chat_model_end":
+                tool_call_assembler.finish(run_id)
 
         # After streaming completes, check state for tool calls or completion
-        state = await agent.aget_state(config)
-
-        if state.next:
-            # Agent is paused at interrupt - extract tool calls
-            messages = state.values.get("messages", [])
-            if messages:
-                last_msg = messages[-1]
-                if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-                    tool_calls = []
-                    for tc in last_msg.tool_calls:
-                        tool_calls.append({
-                            "id": tc["id"],
-                            "name": tc["name"],
-                            "args": tc["args"],
-                        })
-                    yield {
-                        "type": "tool_calls",
-                        "thread_id": thread_id,
-                        "tool_calls": tool_calls,
-                        "done": False,
-                    }
-                    return
-
-        # Agent completed - get final message
-        messages = state.values.get("messages", [])
-        if messages:
-            last_message = messages[-1]
-            content = last_message.content if hasattr(last_message, "content") else str(last_message)
+        step = await finalize_step(agent, config, thread_id)
+        if not step["done"]:
+            # Agent is paused at interrupt - send tool calls
+            yield {
+                "type": "tool_calls",
+                "thread_id": thread_id,
+                "tool_calls": step["tool_calls"],
+                "done": False,
+            }
+        elif step["message"] is not None:
+            # Agent completed - send final message
             yield {
                 "type": "message",
                 "thread_id": thread_id,
-                "content": content,
+                "content": step["message"],
                 "done": True,
             }
 
     except Exception as e:
-        yield {"type": "error", "thread_id": thread_id, "error": str(e)}
+        yield {"type": "error", "thread_id": thread_id, "error": format_api_error(e)}
@@ -0,0 +1,98 @@
+"""Embedding-similarity cache for hybrid agent tool-call plans.
+
+Replays the tool calls of an earlier fresh session when a new prompt means the
+same thing against the same song state ("make drums louder" vs "turn up the
+drums"). Prompts are embedded with a local all-MiniLM-L6-v2 ONNX export, so a
+lookup is a few milliseconds of CPU instead of an LLM round-trip.
+
+Requires numpy, onnxruntime and tokenizers, which are only imported when
+SEMANTIC_CACHE_ENABLED is set.
+"""
+
+import hashlib
+import os
+from typing import Optional
+import numpy as np
+import onnxruntime
+from tokenizers import Tokenizer
+
+EMBEDDING_DIM = 384
+MAX_PROMPT_TOKENS = 256
+
+
+def context_hash(context: Optional[str]) -> bytes:
+    """Hash the song state so only plans made against the same state match."""
+    return hashlib.blake2b((context or "").encode(), digest_size=16).digest()
+
+
+class SemanticCache:
+    """Flat inner-product index of prompt embeddings with LRU eviction.
+
+    Embeddings are L2-normalized, so the inner product is cosine similarity.
+    The index is a fixed (maxsize, 384) matrix; at this size a brute-force
+    matrix-vector product is as fast as a dedicated vector index.
+    """
+
+    def __init__(self, model_dir: str, threshold: float = 0.97, maxsize: int = 512):
+        self.threshold = threshold
+        self.maxsize = maxsize
+
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=MAX_PROMPT_TOKENS)
+
+        self._vectors = np.zeros((maxsize, EMBEDDING_DIM), dtype=np.float32)
+        self._payloads: list[Optional[tuple[bytes, list[dict]]]] = [None] * maxsize
+        self._size = 0
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._clock = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as a normalized mean-pooled MiniLM vector.
+
+        CPU-bound; call it off the event loop.
+        """
+        encoding = self._tokenizer.encode(text)
+        inputs = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids], dtype=np.int64),
+        }
+        hidden = self._session.run(
+            None, {name: value for name, value in inputs.items() if name in self._input_names}
+        )[0][0]
+
+        mask = inputs["attention_mask"][0][:, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=0) / max(mask.sum(), 1.0)
+        return pooled / max(np.linalg.norm(pooled), 1e-12)
+
+    def _touch(self, slot: int) -> None:
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    def lookup(self, embedding: np.ndarray, context: Optional[str]) -> Optional[list[dict]]:
+        """Return the cached tool calls of the closest match, if similar enough."""
+        key = context_hash(context)
+        similarities = self._vectors[:self._size] @ embedding
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        for slot in candidates[np.argsort(-similarities[candidates])]:
+            payload = self._payloads[slot]
+            if payload is not None and payload[0] == key:
+                self._touch(slot)
+                return payload[1]
+        return None
+
+    def store(self, embedding: np.ndarray, context: Optional[str], tool_calls: list[dict]) -> None:
+        """Add a plan, evicting the least recently used entry when full."""
+        if self._size < self.maxsize:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+        self._vectors[slot] = embedding
+        self._payloads[slot] = (context_hash(context), tool_calls)
+        self._touch(slot)